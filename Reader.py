@@ -1,13 +1,221 @@
 ﻿import cv2
 import mysql.connector
+from mysql.connector.pooling import MySQLConnectionPool
 import numpy as np
-import json
+from numba import njit
+import xxhash
+from contextlib import contextmanager
+from collections import OrderedDict
 from typing import Dict, Optional, Tuple
+import logging
+import os
 import sys
-import hashlib
-import base64
 from config import HOST, USER, PASSWORD, DATABASE, PORT, CHARSET
 
+log = logging.getLogger(__name__)
+
+# Fingerprint templates are fixed-length binary vectors compared by Hamming distance
+FP_BITS = 512
+FP_BYTES = FP_BITS // 8
+
+# Frames are downsampled to this size before feature extraction; a template
+# needs far fewer pixels than a raw webcam frame
+FP_IMAGE_SIZE = 400
+
+# Per-contour features kept as a structured array instead of per-feature
+# dicts: 12 bytes per contour and no boxed floats
+FEATURE_DTYPE = np.dtype([('area', 'f4'), ('perimeter', 'f4'), ('circularity', 'f4')])
+
+# Minimum Jaccard overlap (shared bits / union bits) for two templates to
+# count as a match. Templates are sparse -- roughly one set bit per surviving
+# contour -- so an absolute Hamming cutoff cannot separate anything: two
+# unrelated n-bit templates differ in at most ~2n bits, far below any fixed
+# fraction of FP_BITS. The overlap ratio is density-independent: disjoint bit
+# sets score 0.0, identical sets 1.0, and genuine re-captures of one finger
+# share most of their descriptor bits while impostors share almost none.
+JACCARD_THRESHOLD = 0.3
+
+# Candidate pre-filter: only templates whose feature count is within this
+# tolerance of the query are fetched, closest mean areas first
+FP_COUNT_TOLERANCE = 25
+FP_CANDIDATE_LIMIT = 50
+
+# Fingerprint template: (packed bit vector, feature count, mean contour area)
+FingerprintTemplate = Tuple[bytes, int, float]
+
+# SQL reused on every identification/enrollment
+CANDIDATE_QUERY = """
+SELECT student_id, fp_bits
+FROM students
+WHERE fp_bits IS NOT NULL
+  AND fp_feat_count BETWEEN %s AND %s
+ORDER BY ABS(fp_mean_area - %s)
+LIMIT %s
+"""
+
+STUDENT_QUERY = """
+SELECT student_id, first_name, last_name, email, phone,
+       department, year_of_study, enrollment_date, status
+FROM students
+WHERE student_id = %s
+"""
+
+ENROLL_QUERY = """
+UPDATE students
+SET fp_bits = %s,
+    fp_feat_count = %s,
+    fp_mean_area = %s
+WHERE student_id = %s
+"""
+
+@njit(cache=True, fastmath=True)
+def _contour_feats(pts: np.ndarray, offsets: np.ndarray):
+    """
+    Compute area, perimeter and circularity for a batch of contours
+
+    Args:
+        pts: All contour points stacked into one float32 array of shape (P, 2)
+        offsets: Start index of each contour in pts, plus a final end index
+
+    Returns:
+        Tuple of float64 arrays: (areas, perimeters, circularities)
+    """
+    n = offsets.shape[0] - 1
+    areas = np.empty(n, dtype=np.float64)
+    perimeters = np.empty(n, dtype=np.float64)
+    circularities = np.empty(n, dtype=np.float64)
+    for i in range(n):
+        start = offsets[i]
+        end = offsets[i + 1]
+        area = 0.0
+        perimeter = 0.0
+        for j in range(start, end):
+            k = start if j == end - 1 else j + 1
+            x0, y0 = pts[j, 0], pts[j, 1]
+            x1, y1 = pts[k, 0], pts[k, 1]
+            # Shoelace formula for the polygon area
+            area += x0 * y1 - x1 * y0
+            dx = x1 - x0
+            dy = y1 - y0
+            perimeter += np.sqrt(dx * dx + dy * dy)
+        area = abs(area) * 0.5
+        areas[i] = area
+        perimeters[i] = perimeter
+        circularities[i] = 4.0 * np.pi * area / (perimeter * perimeter) if perimeter > 0.0 else 0.0
+    return areas, perimeters, circularities
+
+# Template cache keyed by the xxh3 digest of the frame, bounded like the old
+# lru_cache but without retaining (or re-hashing) frame-sized byte strings
+_TEMPLATE_CACHE_SIZE = 32
+_template_cache: "OrderedDict[int, Optional[FingerprintTemplate]]" = OrderedDict()
+
+def _cached_extract(gray: np.ndarray) -> Optional[FingerprintTemplate]:
+    """
+    Memoized front end for _extract_impl
+
+    Re-capturing an identical frame skips the blur/threshold/contour work
+    entirely; xxh3 digests the frame at memory bandwidth, unlike MD5.
+    """
+    # xxh3 reads the frame in place through the buffer protocol, so no
+    # frame-sized tobytes() copy is made just to compute the key
+    key = xxhash.xxh3_64_intdigest(gray)
+    if key in _template_cache:
+        _template_cache.move_to_end(key)
+        return _template_cache[key]
+
+    template = _extract_impl(gray)
+    _template_cache[key] = template
+    if len(_template_cache) > _TEMPLATE_CACHE_SIZE:
+        _template_cache.popitem(last=False)
+    return template
+
+def _extract_impl(gray: np.ndarray) -> Optional[FingerprintTemplate]:
+    """
+    Run the OpenCV pipeline on a grayscale frame and build the template
+
+    Args:
+        gray: Grayscale frame as a contiguous uint8 array
+
+    Returns:
+        FingerprintTemplate: Template or None if no usable features found
+    """
+    # Downsample before the expensive steps; blur, threshold and contour
+    # extraction all scale with pixel count
+    if gray.shape[0] > FP_IMAGE_SIZE or gray.shape[1] > FP_IMAGE_SIZE:
+        gray = cv2.resize(gray, (FP_IMAGE_SIZE, FP_IMAGE_SIZE), interpolation=cv2.INTER_AREA)
+
+    # Apply Gaussian blur to reduce noise
+    blurred = cv2.GaussianBlur(gray, (5, 5), 0)
+
+    # Apply threshold to get binary image
+    _, thresh = cv2.threshold(blurred, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+
+    # Find contours (fingerprint ridges)
+    contours, _ = cv2.findContours(thresh, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+
+    if not contours:
+        return None
+
+    # Pack every contour's points into one flat float32 array and
+    # compute all features in a single JIT-compiled call
+    pts = np.ascontiguousarray(
+        np.concatenate([c.reshape(-1, 2) for c in contours]).astype(np.float32))
+    lengths = np.fromiter((c.shape[0] for c in contours),
+                          dtype=np.int64, count=len(contours))
+    offsets = np.zeros(len(contours) + 1, dtype=np.int64)
+    np.cumsum(lengths, out=offsets[1:])
+
+    areas, perimeters, circularities = _contour_feats(pts, offsets)
+
+    # Filter small contours, matching the old per-contour check
+    mask = (areas > 50) & (perimeters > 0)
+    feats = np.empty(int(mask.sum()), dtype=FEATURE_DTYPE)
+    feats['area'] = areas[mask]
+    feats['perimeter'] = perimeters[mask]
+    feats['circularity'] = circularities[mask]
+
+    if feats.size == 0:
+        return None
+
+    # Hash each contour's quantized shape descriptor to a bit position,
+    # giving a fixed-length binary fingerprint vector
+    bits = np.zeros(FP_BITS, dtype=np.uint8)
+    for area, perimeter, circularity in feats:
+        descriptor = (
+            int(area // 25),
+            int(perimeter // 10),
+            int(circularity * 20),
+        )
+        bits[xxhash.xxh3_64_intdigest(str(descriptor)) % FP_BITS] = 1
+
+    fp_bits = np.packbits(bits).tobytes()
+
+    # Scalar summaries stored alongside the bit vector
+    feat_count = int(feats.size)
+    mean_area = float(feats['area'].mean())
+
+    return fp_bits, feat_count, mean_area
+
+def _popcount(rows: np.ndarray) -> np.ndarray:
+    """Per-row popcount over a uint64 matrix"""
+    if hasattr(np, 'bitwise_count'):
+        # NumPy >= 2.0 lowers this to hardware popcount instructions
+        return np.bitwise_count(rows).sum(axis=1)
+    return np.unpackbits(rows.view(np.uint8), axis=1).sum(axis=1)
+
+def _hamming(query_bits: bytes, db_bits: np.ndarray) -> np.ndarray:
+    """
+    Hamming distances between a query template and a stack of stored templates
+
+    Args:
+        query_bits: Packed query bit vector of FP_BYTES bytes
+        db_bits: uint64 array of shape (N, FP_BYTES // 8), one row per template
+
+    Returns:
+        np.ndarray: Number of differing bits for each stored template
+    """
+    return _popcount(np.bitwise_xor(db_bits, np.frombuffer(query_bits, dtype=np.uint64)))
+
 class StudentFingerprintReader:
     def __init__(self, db_config: Dict[str, str]):
         """
@@ -17,38 +225,71 @@ class StudentFingerprintReader:
             db_config: Dictionary containing MySQL connection parameters
         """
         self.db_config = db_config
-        self.connection = None
-        
+        self.pool = None
+        self._cap = None
+
+        # Contour extraction works on one small downsampled frame at a time
+        # and gains nothing from parallel cv2; on many-core machines the
+        # default thread pool only adds contention
+        cv2.setNumThreads(1)
+        os.environ.setdefault("OMP_NUM_THREADS", "1")
+
     def connect_database(self) -> bool:
         """
-        Establish connection to MySQL database
-        
+        Set up the MySQL connection pool
+
         Returns:
             bool: True if connection successful, False otherwise
         """
         try:
-            self.connection = mysql.connector.connect(**self.db_config)
+            # Pooling amortizes the TCP + auth handshake across operations
+            self.pool = MySQLConnectionPool(pool_name="fp", pool_size=25, **self.db_config)
             print("✅ Database connection established successfully!")
             return True
         except mysql.connector.Error as err:
             print(f"❌ Database connection failed: {err}")
             return False
-    
+
+    @contextmanager
+    def _conn(self):
+        """Check a connection out of the pool and return it when done"""
+        connection = self.pool.get_connection()
+        try:
+            yield connection
+        finally:
+            connection.close()
+
     def close_database(self):
-        """Close database connection"""
-        if self.connection and self.connection.is_connected():
-            self.connection.close()
+        """Close database connection pool"""
+        if self.pool:
+            self.pool = None
             print("🔌 Database connection closed.")
+
+    def _camera(self) -> cv2.VideoCapture:
+        """Open the camera on first use and keep it warm across scans"""
+        if self._cap is None or not self._cap.isOpened():
+            self._cap = cv2.VideoCapture(0)
+            # Keep only the freshest frame so captures are never stale
+            self._cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+        return self._cap
+
+    def close(self):
+        """Release the camera and close the database connection pool"""
+        if self._cap is not None:
+            self._cap.release()
+            self._cap = None
+        self.close_database()
     
-    def extract_fingerprint_features(self, fingerprint_image: np.ndarray) -> Optional[str]:
+    def extract_fingerprint_features(self, fingerprint_image: np.ndarray) -> Optional[FingerprintTemplate]:
         """
         Extract fingerprint features and create a template
-        
+
         Args:
             fingerprint_image: Input fingerprint image
-            
+
         Returns:
-            str: Base64 encoded fingerprint template or None if extraction fails
+            FingerprintTemplate: Packed binary fingerprint vector plus scalar
+            summaries, or None if extraction fails
         """
         try:
             # Convert to grayscale if needed
@@ -56,57 +297,24 @@ class StudentFingerprintReader:
                 gray = cv2.cvtColor(fingerprint_image, cv2.COLOR_BGR2GRAY)
             else:
                 gray = fingerprint_image
-            
-            # Apply Gaussian blur to reduce noise
-            blurred = cv2.GaussianBlur(gray, (5, 5), 0)
-            
-            # Apply threshold to get binary image
-            _, thresh = cv2.threshold(blurred, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
-            
-            # Find contours (fingerprint ridges)
-            contours, _ = cv2.findContours(thresh, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
-            
-            # Extract key features
-            features = []
-            for contour in contours:
-                if cv2.contourArea(contour) > 50:  # Filter small contours
-                    # Get contour properties
-                    area = cv2.contourArea(contour)
-                    perimeter = cv2.arcLength(contour, True)
-                    if perimeter > 0:
-                        circularity = 4 * np.pi * area / (perimeter * perimeter)
-                        features.append({
-                            'area': float(area),
-                            'perimeter': float(perimeter),
-                            'circularity': float(circularity)
-                        })
-            
-            # Create a simple template from features
-            template = {
-                'features': features,
-                'image_hash': hashlib.md5(fingerprint_image.tobytes()).hexdigest()
-            }
-            
-            # Convert to base64 for storage
-            template_json = json.dumps(template)
-            template_b64 = base64.b64encode(template_json.encode()).decode()
-            
-            return template_b64
-            
+
+            return _cached_extract(np.ascontiguousarray(gray))
+
         except Exception as e:
-            print(f" Fingerprint feature extraction failed: {e}")
+            # Diagnostic only; the capture loop already tells the user to retry
+            log.debug("Fingerprint feature extraction failed: %s", e)
             return None
     
-    def scan_fingerprint(self) -> Optional[str]:
+    def scan_fingerprint(self) -> Optional[FingerprintTemplate]:
         """
         Scan fingerprint using camera
-        
+
         Returns:
-            str: Fingerprint template or None if no fingerprint detected
+            FingerprintTemplate: Fingerprint template or None if no fingerprint detected
         """
-        # Initialize camera
-        cap = cv2.VideoCapture(0)
-        
+        # Reuse the warmed-up camera; opening the device costs hundreds of ms
+        cap = self._camera()
+
         if not cap.isOpened():
             print(" Could not open camera")
             return None
@@ -134,137 +342,102 @@ class StudentFingerprintReader:
                 
                 if template:
                     print(" Fingerprint captured successfully!")
-                    cap.release()
                     cv2.destroyAllWindows()
                     return template
                 else:
                     print(" Failed to extract fingerprint features. Try again.")
-        
-        # Clean up
-        cap.release()
+
+        # Clean up the preview window; the camera stays open for the next scan
         cv2.destroyAllWindows()
         return None
     
-    def match_fingerprint(self, input_template: str) -> Optional[Dict]:
+    def match_fingerprint(self, input_template: FingerprintTemplate) -> Optional[Dict]:
         """
         Match fingerprint template against database
-        
+
         Args:
-            input_template: Base64 encoded fingerprint template
-            
+            input_template: Fingerprint template from extract_fingerprint_features
+
         Returns:
             Dict: Student details if match found, None otherwise
         """
-        if not self.connection or not self.connection.is_connected():
+        if not self.pool:
             print(" No database connection available")
             return None
-            
+
+        q_bits, q_count, q_mean = input_template
+
+        if len(q_bits) != FP_BYTES:
+            print(" Invalid fingerprint template format")
+            return None
+
         try:
-            cursor = self.connection.cursor(dictionary=True)
-            
-            # Get all fingerprint templates from database
-            query = """
-            SELECT 
-                student_id,
-                first_name,
-                last_name,
-                email,
-                phone,
-                department,
-                year_of_study,
-                enrollment_date,
-                status,
-                fingerprint_template
-            FROM students 
-            WHERE fingerprint_template IS NOT NULL
-            """
-            
-            cursor.execute(query)
-            results = cursor.fetchall()
-            cursor.close()
-            
-            if not results:
-                print(" No fingerprint templates found in database")
-                return None
-            
-            # Decode input template
-            try:
-                input_data = json.loads(base64.b64decode(input_template).decode())
-                input_features = input_data.get('features', [])
-            except:
-                print(" Invalid fingerprint template format")
-                return None
-            
-            best_match = None
-            best_score = 0.0
-            threshold = 0.7  # Similarity threshold
-            
-            for student in results:
-                try:
-                    # Decode stored template
-                    stored_data = json.loads(base64.b64decode(student['fingerprint_template']).decode())
-                    stored_features = stored_data.get('features', [])
-                    
-                    # Calculate similarity score
-                    similarity = self.calculate_similarity(input_features, stored_features)
-                    
-                    if similarity > best_score and similarity > threshold:
-                        best_score = similarity
-                        best_match = student
-                        
-                except Exception as e:
-                    print(f" Error processing template for {student['student_id']}: {e}")
-                    continue
-            
-            if best_match:
+            with self._conn() as connection:
+                cursor = connection.cursor(buffered=False)
+
+                # Pre-filter on the indexed scalar summaries so only the
+                # closest candidates' template bytes cross the wire
+                cursor.execute(CANDIDATE_QUERY, (q_count - FP_COUNT_TOLERANCE,
+                                                 q_count + FP_COUNT_TOLERANCE,
+                                                 q_mean, FP_CANDIDATE_LIMIT))
+
+                # Stream rows as they arrive so decoding overlaps the network
+                # transfer instead of waiting on a fetchall() materialization
+                student_ids = []
+                bit_rows = []
+                for sid, fp_bits in cursor:
+                    # VARBINARY(64) happily stores short values, and one bad
+                    # row must not break the whole batch decode
+                    if len(fp_bits) != FP_BYTES:
+                        log.debug("Skipping malformed template for %s", sid)
+                        continue
+                    student_ids.append(sid)
+                    bit_rows.append(fp_bits)
+                cursor.close()
+
+                if not bit_rows:
+                    print(" No fingerprint templates found in database")
+                    return None
+
+                # Templates are fixed-length, so one concatenation + reshape
+                # decodes the whole batch in a single allocation
+                db_bits = np.frombuffer(b"".join(bit_rows), dtype=np.uint64)
+                db_bits = db_bits.reshape(len(bit_rows), FP_BYTES // 8)
+
+                # Hamming distance over all templates in one vectorized call
+                distances = _hamming(q_bits, db_bits)
+
+                # Turn distances into Jaccard overlaps: with the popcounts of
+                # both sides, |A & B| = (|A| + |B| - dist) / 2 and
+                # |A | B| = (|A| + |B| + dist) / 2
+                q_pop = int(_popcount(np.frombuffer(q_bits, dtype=np.uint64).reshape(1, -1))[0])
+                db_pops = _popcount(db_bits)
+                scores = (q_pop + db_pops - distances) / np.maximum(q_pop + db_pops + distances, 1)
+
+                best_idx = int(np.argmax(scores))
+                best_score = float(scores[best_idx])
+
+                if best_score < JACCARD_THRESHOLD:
+                    print(f" No matching fingerprint found (best score: {best_score:.2f})")
+                    return None
+
+                # Re-fetch the full row only for the winner
+                cursor = connection.cursor(dictionary=True)
+                cursor.execute(STUDENT_QUERY, (student_ids[best_idx],))
+                best_match = cursor.fetchone()
+                cursor.close()
+
+                if not best_match:
+                    log.debug("Matched student %s could not be loaded", student_ids[best_idx])
+                    return None
+
                 print(f" Fingerprint match found! Similarity: {best_score:.2f}")
-                # Remove fingerprint template from result
-                del best_match['fingerprint_template']
                 return dict(best_match)
-            else:
-                print(f" No matching fingerprint found (best score: {best_score:.2f})")
-                return None
-                
+
         except mysql.connector.Error as err:
             print(f" Database query failed: {err}")
             return None
     
-    def calculate_similarity(self, features1: list, features2: list) -> float:
-        """
-        Calculate similarity between two fingerprint feature sets
-        
-        Args:
-            features1: First set of features
-            features2: Second set of features
-            
-        Returns:
-            float: Similarity score (0.0 to 1.0)
-        """
-        if not features1 or not features2:
-            return 0.0
-        
-        # Simple similarity calculation based on feature count and properties
-        # In a real implementation, you'd use more sophisticated algorithms
-        
-        # Normalize feature counts
-        count_similarity = min(len(features1), len(features2)) / max(len(features1), len(features2))
-        
-        # Calculate average area similarity
-        areas1 = [f['area'] for f in features1]
-        areas2 = [f['area'] for f in features2]
-        
-        if areas1 and areas2:
-            avg_area1 = sum(areas1) / len(areas1)
-            avg_area2 = sum(areas2) / len(areas2)
-            area_similarity = 1.0 - abs(avg_area1 - avg_area2) / max(avg_area1, avg_area2)
-        else:
-            area_similarity = 0.0
-        
-        # Weighted combination
-        similarity = 0.6 * count_similarity + 0.4 * area_similarity
-        
-        return min(1.0, max(0.0, similarity))
-    
     def enroll_fingerprint(self, student_id: str) -> bool:
         """
         Enroll a new fingerprint for a student
@@ -282,18 +455,16 @@ class StudentFingerprintReader:
         if not template:
             return False
         
+        fp_bits, feat_count, mean_area = template
+
         # Update database
         try:
-            cursor = self.connection.cursor()
-            query = """
-            UPDATE students 
-            SET fingerprint_template = %s 
-            WHERE student_id = %s
-            """
-            cursor.execute(query, (template, student_id))
-            self.connection.commit()
-            cursor.close()
-            
+            with self._conn() as connection:
+                cursor = connection.cursor()
+                cursor.execute(ENROLL_QUERY, (fp_bits, feat_count, mean_area, student_id))
+                connection.commit()
+                cursor.close()
+
             print(f" Fingerprint enrolled successfully for {student_id}")
             return True
             
@@ -353,7 +524,7 @@ class StudentFingerprintReader:
         except KeyboardInterrupt:
             print("\n\n Application interrupted by user")
         finally:
-            self.close_database()
+            self.close()
             print(" Application closed successfully!")
 
 def main():
@@ -15,7 +15,9 @@ CREATE TABLE IF NOT EXISTS students (
     year_of_study INT,
     enrollment_date DATE,
     status ENUM('active', 'inactive', 'graduated') DEFAULT 'active',
-    fingerprint_template LONGTEXT,  -- Store base64 encoded fingerprint template
+    fp_bits VARBINARY(64),          -- Packed 512-bit fingerprint vector
+    fp_feat_count INT,              -- Precomputed feature count for fast matching
+    fp_mean_area DOUBLE,            -- Precomputed mean contour area for fast matching
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
 );
@@ -32,4 +34,4 @@ INSERT INTO students (student_id, first_name, last_name, email, phone, departmen
 CREATE INDEX idx_student_email ON students(email);
 CREATE INDEX idx_student_department ON students(department);
 CREATE INDEX idx_student_status ON students(status);
-CREATE INDEX idx_fingerprint_template ON students(fingerprint_template(100));  -- Index for fingerprint searches
+CREATE INDEX idx_fp_count ON students(fp_feat_count);  -- Candidate pre-filter for matching